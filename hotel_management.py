@@ -10,6 +10,9 @@ import os
 import re
 
 class HotelManagementApp:
+    REQUEST_PRIORITIES = {'Высокий': 1, 'Обычный': 2, 'Низкий': 3}
+    REQUEST_SERVICES = {'Хозяйственная служба': 'Уборщик', 'Ресепшн': 'Администратор'}
+
     def __init__(self, root):
         self.root = root
         self.root.option_add("*Font", "TkDefaultFont 12")
@@ -29,7 +32,11 @@ class HotelManagementApp:
         self.current_user = None
         self.init_db()
         self.load_rooms_from_excel('Номерной фонд.xlsx')
+        self.change_handlers = {}
+        self.last_change_seq = self.cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+        self.data_version = self.cursor.execute("PRAGMA data_version").fetchone()[0]
         self.create_login_form()
+        self.root.after(500, self.poll_changes)
 
     def init_db(self):
         self.cursor.executescript("""
@@ -48,7 +55,19 @@ class HotelManagementApp:
                 request TEXT,
                 status TEXT CHECK(status IN ('Новая', 'В работе', 'Выполнено')),
                 request_date DATE DEFAULT CURRENT_DATE,
-                FOREIGN KEY(guest_id) REFERENCES guests(guestID)
+                booking_id INTEGER,
+                room_id INTEGER,
+                floor TEXT,
+                role TEXT,
+                priority INTEGER DEFAULT 2,
+                staff_id INTEGER,
+                created_at TIMESTAMP,
+                claimed_at TIMESTAMP,
+                completed_at TIMESTAMP,
+                FOREIGN KEY(guest_id) REFERENCES guests(guestID),
+                FOREIGN KEY(booking_id) REFERENCES bookings(bookingID),
+                FOREIGN KEY(room_id) REFERENCES rooms(roomID),
+                FOREIGN KEY(staff_id) REFERENCES staff(staffID)
             );
 
             CREATE TABLE IF NOT EXISTS rooms (
@@ -100,7 +119,68 @@ class HotelManagementApp:
                 FOREIGN KEY(room_id) REFERENCES rooms(roomID),
                 FOREIGN KEY(staff_id) REFERENCES staff(staffID)
             );
+
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                status TEXT
+            );
+
+            CREATE TRIGGER IF NOT EXISTS rooms_insert_log AFTER INSERT ON rooms
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, status) VALUES ('rooms', NEW.roomID, NEW.status);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS rooms_status_log AFTER UPDATE OF status ON rooms
+            WHEN NEW.status IS NOT OLD.status
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, status) VALUES ('rooms', NEW.roomID, NEW.status);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS bookings_insert_log AFTER INSERT ON bookings
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, status) VALUES ('bookings', NEW.bookingID, NEW.status);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS bookings_status_log AFTER UPDATE OF status ON bookings
+            WHEN NEW.status IS NOT OLD.status
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, status) VALUES ('bookings', NEW.bookingID, NEW.status);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS cleaning_insert_log AFTER INSERT ON cleaning
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, status) VALUES ('cleaning', NEW.cleaningID, NEW.status);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS cleaning_status_log AFTER UPDATE OF status ON cleaning
+            WHEN NEW.status IS NOT OLD.status
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, status) VALUES ('cleaning', NEW.cleaningID, NEW.status);
+            END;
         """)
+        # Базы, созданные до появления очереди запросов, дополняются недостающими колонками
+        request_columns = {column[1] for column in self.cursor.execute("PRAGMA table_info(guest_requests)").fetchall()}
+        for column, definition in [
+            ('booking_id', 'INTEGER REFERENCES bookings(bookingID)'),
+            ('room_id', 'INTEGER REFERENCES rooms(roomID)'),
+            ('floor', 'TEXT'),
+            ('role', 'TEXT'),
+            ('priority', 'INTEGER DEFAULT 2'),
+            ('staff_id', 'INTEGER REFERENCES staff(staffID)'),
+            ('created_at', 'TIMESTAMP'),
+            ('claimed_at', 'TIMESTAMP'),
+            ('completed_at', 'TIMESTAMP'),
+        ]:
+            if column not in request_columns:
+                self.cursor.execute(f"ALTER TABLE guest_requests ADD COLUMN {column} {definition}")
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_guest_requests_queue
+            ON guest_requests (status, role, priority, created_at)
+        """)
+        # Терминалы при запуске строят экраны заново, поэтому старую историю изменений можно не хранить
+        self.cursor.execute("DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - 10000")
         self.cursor.execute("INSERT OR IGNORE INTO staff (full_name, role, login, password) VALUES (?, ?, ?, ?)",
                            ("Админ", "Администратор", "AAA", self.hash_password("121212")))
         self.conn.commit()
@@ -249,15 +329,18 @@ class HotelManagementApp:
             tbs.Button(button_frame, text="Управление бронированиями", command=self.create_booking_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="Управление номерами", command=self.create_room_management_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="График уборки", command=self.create_cleaning_schedule_form, bootstyle="primary-outline", width=40).pack(pady=15)
+            tbs.Button(button_frame, text="Запросы гостей", command=self.create_guest_requests_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="Отчеты", command=self.create_reports_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="Разблокировать пользователей", command=self.create_unblock_users_form, bootstyle="danger-outline", width=40).pack(pady=15)
         elif self.current_user[2] == 'Уборщик':
             tbs.Button(button_frame, text="Управление номерами", command=self.create_room_management_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="График уборки", command=self.create_cleaning_schedule_form, bootstyle="primary-outline", width=40).pack(pady=15)
+            tbs.Button(button_frame, text="Запросы гостей", command=self.create_guest_requests_form, bootstyle="primary-outline", width=40).pack(pady=15)
         elif self.current_user[2] == 'Руководитель':
             tbs.Button(button_frame, text="Управление бронированиями", command=self.create_booking_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="Управление номерами", command=self.create_room_management_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="График уборки", command=self.create_cleaning_schedule_form, bootstyle="primary-outline", width=40).pack(pady=15)
+            tbs.Button(button_frame, text="Запросы гостей", command=self.create_guest_requests_form, bootstyle="primary-outline", width=40).pack(pady=15)
             tbs.Button(button_frame, text="Отчеты", command=self.create_reports_form, bootstyle="primary-outline", width=40).pack(pady=15)
 
     def create_add_user_form(self):
@@ -331,6 +414,19 @@ class HotelManagementApp:
         
         room_cb = tbs.Combobox(form_frame, textvariable=room_selection_var, values=list(booking_room_map.keys()), bootstyle="primary", state="readonly")
         room_cb.grid(row=4, column=1, sticky=(W, E), padx=5, pady=5)
+
+        def apply_room_change(room_id, status):
+            for key in [k for k, v in booking_room_map.items() if v == room_id]:
+                del booking_room_map[key]
+            if status in ('Свободен', 'Чистый'):
+                room = self.conn.execute("SELECT room_number, floor FROM rooms WHERE roomID = ?", (room_id,)).fetchone()
+                if room:
+                    booking_room_map[f"{room[0]} ({room_categories_excel.get(str(room[0]), 'Не указана')}, этаж {room[1]})"] = room_id
+            if room_selection_var.get() not in booking_room_map:
+                room_selection_var.set('')
+            room_cb.configure(values=list(booking_room_map.keys()))
+
+        self.change_handlers['rooms'] = apply_room_change
         
         tbs.Label(form_frame, text="Дата заезда:", bootstyle="inverse-primary").grid(row=5, column=0, sticky=W, padx=5, pady=5)
         tbs.Entry(form_frame, textvariable=check_in_var, bootstyle="primary").grid(row=5, column=1, sticky=(W, E), padx=5, pady=5)
@@ -444,12 +540,23 @@ class HotelManagementApp:
             df = pd.read_excel('Номерной фонд.xlsx')
             room_categories_excel = dict(zip(df['Номер'].astype(str), df['Категория']))
 
-        rooms = self.cursor.execute("SELECT room_number, floor, status, price_per_night FROM rooms").fetchall()
+        rooms = self.cursor.execute("SELECT roomID, room_number, floor, status, price_per_night FROM rooms").fetchall()
         for room in rooms:
-            category = room_categories_excel.get(str(room[0]), "Не указана")
-            tree.insert('', 'end', values=(room[0], room[1], category, room[2], room[3]))
+            category = room_categories_excel.get(str(room[1]), "Не указана")
+            tree.insert('', 'end', iid=str(room[0]), values=(room[1], room[2], category, room[3], room[4]))
         table_frame.pack_configure(pady=(10, 10))
 
+        def apply_room_change(room_id, status):
+            if tree.exists(str(room_id)):
+                tree.set(str(room_id), 'Статус', status)
+                return
+            room = self.conn.execute("SELECT room_number, floor, status, price_per_night FROM rooms WHERE roomID = ?", (room_id,)).fetchone()
+            if room:
+                category = room_categories_excel.get(str(room[0]), "Не указана")
+                tree.insert('', 'end', iid=str(room_id), values=(room[0], room[1], category, room[2], room[3]))
+
+        self.change_handlers['rooms'] = apply_room_change
+
     def create_cleaning_schedule_form(self):
         content_frame = self.create_base_form(self.create_main_menu)
         tree = tbs.Treeview(content_frame, columns=('Номер', 'Дата', 'Статус'), show='headings', bootstyle="primary")
@@ -460,16 +567,31 @@ class HotelManagementApp:
         tree.column('Дата', anchor='center')
         tree.column('Статус', anchor='center')
         tree.pack(expand=True, fill='both', pady=10)
-        cleanings = self.cursor.execute("""
-            SELECT r.room_number, c.scheduled_date, c.status 
+        cleaning_query = """
+            SELECT c.cleaningID, r.room_number, c.scheduled_date, c.status 
             FROM cleaning c 
             JOIN rooms r ON c.room_id = r.roomID 
             WHERE c.status = 'Назначено' 
             AND (? = 'Администратор' OR ? = 'Руководитель' OR c.staff_id = ?)
-        """, (self.current_user[2], self.current_user[2], self.current_user[0])).fetchall()
+        """
+        cleaning_params = (self.current_user[2], self.current_user[2], self.current_user[0])
+        cleanings = self.cursor.execute(cleaning_query, cleaning_params).fetchall()
         
         for cleaning_item in cleanings:
-            tree.insert('', 'end', values=cleaning_item)
+            tree.insert('', 'end', iid=str(cleaning_item[0]), values=cleaning_item[1:])
+
+        def apply_cleaning_change(cleaning_id, status):
+            if status != 'Назначено':
+                if tree.exists(str(cleaning_id)):
+                    tree.delete(str(cleaning_id))
+                return
+            if tree.exists(str(cleaning_id)):
+                return
+            cleaning_item = self.conn.execute(cleaning_query + " AND c.cleaningID = ?", cleaning_params + (cleaning_id,)).fetchone()
+            if cleaning_item:
+                tree.insert('', 'end', iid=str(cleaning_item[0]), values=cleaning_item[1:])
+
+        self.change_handlers['cleaning'] = apply_cleaning_change
             
         button_frame = tbs.Frame(content_frame, bootstyle="primary")
         button_frame.pack(pady=10)
@@ -592,6 +714,163 @@ class HotelManagementApp:
         self.create_cleaning_schedule_form()
 
 
+    def create_guest_requests_form(self):
+        content_frame = self.create_base_form(self.create_main_menu)
+        tree = tbs.Treeview(
+            content_frame,
+            columns=('ID', 'Номер', 'Гость', 'Запрос', 'Служба', 'Приоритет', 'Статус', 'Ожидает'),
+            show='headings',
+            bootstyle="primary"
+        )
+        tree.heading('ID', text='ID')
+        tree.heading('Номер', text='Номер')
+        tree.heading('Гость', text='Гость')
+        tree.heading('Запрос', text='Запрос')
+        tree.heading('Служба', text='Служба')
+        tree.heading('Приоритет', text='Приоритет')
+        tree.heading('Статус', text='Статус')
+        tree.heading('Ожидает', text='Ожидает, мин')
+        tree.column('ID', anchor='center', width=50)
+        tree.column('Номер', anchor='center', width=70)
+        tree.column('Гость', anchor='center', width=150)
+        tree.column('Запрос', anchor='w', width=200)
+        tree.column('Служба', anchor='center', width=150)
+        tree.column('Приоритет', anchor='center', width=90)
+        tree.column('Статус', anchor='center', width=90)
+        tree.column('Ожидает', anchor='center', width=100)
+        tree.pack(expand=True, fill='both', pady=10)
+
+        services = {role: service for service, role in self.REQUEST_SERVICES.items()}
+        priorities = {value: label for label, value in self.REQUEST_PRIORITIES.items()}
+        requests = self.cursor.execute("""
+            SELECT gr.requestID, r.room_number, g.full_name, gr.request, gr.role, gr.priority, gr.status,
+                   CAST((julianday('now') - julianday(gr.created_at)) * 1440 AS INTEGER)
+            FROM guest_requests gr
+            JOIN rooms r ON gr.room_id = r.roomID
+            JOIN guests g ON gr.guest_id = g.guestID
+            WHERE gr.status IN ('Новая', 'В работе')
+            AND (? IN ('Администратор', 'Руководитель') OR (gr.role = ? AND (gr.status = 'Новая' OR gr.staff_id = ?)))
+            ORDER BY gr.status DESC, gr.priority, gr.created_at
+        """, (self.current_user[2], self.current_user[2], self.current_user[0])).fetchall()
+        for request in requests:
+            tree.insert('', 'end', values=(request[0], request[1], request[2], request[3], services.get(request[4], request[4]),
+                                           priorities.get(request[5], request[5]), request[6], request[7]))
+
+        button_frame = tbs.Frame(content_frame, bootstyle="primary")
+        button_frame.pack(pady=10)
+
+        if self.current_user[2] in ['Администратор', 'Руководитель']:
+            tbs.Button(button_frame, text="Новый запрос", command=self.open_new_guest_request_window, bootstyle="primary-outline").pack(side='left', padx=(0, 10))
+
+        if self.current_user[2] in self.REQUEST_SERVICES.values():
+            floors = [str(f[0]) for f in self.cursor.execute("SELECT DISTINCT floor FROM rooms WHERE floor IS NOT NULL ORDER BY floor").fetchall()]
+            floor_var = tk.StringVar(value='Все этажи')
+            tbs.Combobox(button_frame, textvariable=floor_var, values=['Все этажи'] + floors, bootstyle="primary", state="readonly", width=10).pack(side='left', padx=(0, 10))
+            tbs.Button(button_frame, text="Взять следующий", command=lambda: self.claim_next_guest_request(floor_var.get()), bootstyle="primary-outline").pack(side='left', padx=(0, 10))
+
+        tbs.Button(button_frame, text="Завершить", command=lambda: self.complete_guest_request(tree), bootstyle="primary-outline").pack(side='left')
+
+    def open_new_guest_request_window(self):
+        request_win = tk.Toplevel(self.root)
+        request_win.title("Новый запрос гостя")
+        request_win.geometry("450x260")
+        request_win.grab_set()
+        request_win.resizable(False, False)
+        frame = tbs.Frame(request_win, bootstyle="primary", padding=20)
+        frame.pack(expand=True, fill='both')
+
+        tbs.Label(frame, text="Гость:", bootstyle="inverse-primary").grid(row=0, column=0, sticky=W, padx=5, pady=5)
+        booking_var = tk.StringVar()
+        today = datetime.now().date()
+        current_bookings = self.cursor.execute("""
+            SELECT b.bookingID, b.guest_id, b.room_id, r.floor, r.room_number, g.full_name
+            FROM bookings b
+            JOIN rooms r ON b.room_id = r.roomID
+            JOIN guests g ON b.guest_id = g.guestID
+            WHERE b.status IN ('Забронировано', 'Заселен')
+            AND date(b.check_in) <= date(?) AND date(b.check_out) >= date(?)
+        """, (today, today)).fetchall()
+        booking_map = {f"{b[5]} (номер {b[4]}, этаж {b[3]})": b[:4] for b in current_bookings}
+        tbs.Combobox(frame, textvariable=booking_var, values=list(booking_map.keys()), bootstyle="primary", state="readonly").grid(row=0, column=1, sticky=(W, E), padx=5, pady=5)
+
+        tbs.Label(frame, text="Запрос:", bootstyle="inverse-primary").grid(row=1, column=0, sticky=W, padx=5, pady=5)
+        request_text_var = tk.StringVar()
+        tbs.Entry(frame, textvariable=request_text_var, bootstyle="primary").grid(row=1, column=1, sticky=(W, E), padx=5, pady=5)
+
+        tbs.Label(frame, text="Служба:", bootstyle="inverse-primary").grid(row=2, column=0, sticky=W, padx=5, pady=5)
+        service_var = tk.StringVar(value='Хозяйственная служба')
+        tbs.Combobox(frame, textvariable=service_var, values=list(self.REQUEST_SERVICES.keys()), bootstyle="primary", state="readonly").grid(row=2, column=1, sticky=(W, E), padx=5, pady=5)
+
+        tbs.Label(frame, text="Приоритет:", bootstyle="inverse-primary").grid(row=3, column=0, sticky=W, padx=5, pady=5)
+        priority_var = tk.StringVar(value='Обычный')
+        tbs.Combobox(frame, textvariable=priority_var, values=list(self.REQUEST_PRIORITIES.keys()), bootstyle="primary", state="readonly").grid(row=3, column=1, sticky=(W, E), padx=5, pady=5)
+
+        def create_request_action():
+            booking = booking_map.get(booking_var.get())
+            request_text = request_text_var.get().strip()
+            if not booking or not request_text:
+                messagebox.showerror("Ошибка", "Выберите гостя и опишите запрос", parent=request_win)
+                return
+            booking_id, guest_id, room_id, floor = booking
+            self.cursor.execute("""
+                INSERT INTO guest_requests (guest_id, booking_id, room_id, floor, request, role, priority, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'Новая', CURRENT_TIMESTAMP)
+            """, (guest_id, booking_id, room_id, floor, request_text,
+                  self.REQUEST_SERVICES[service_var.get()], self.REQUEST_PRIORITIES[priority_var.get()]))
+            self.conn.commit()
+            messagebox.showinfo("Успех", "Запрос зарегистрирован", parent=request_win)
+            request_win.destroy()
+            self.create_guest_requests_form()
+        tbs.Button(frame, text="Создать", command=create_request_action, bootstyle="primary").grid(row=4, column=0, columnspan=2, pady=15)
+
+    def claim_next_guest_request(self, floor):
+        floor = None if floor == 'Все этажи' else floor
+        # Забираем запрос условным UPDATE: если другой терминал успел первым, rowcount будет 0 и берем следующий
+        while True:
+            candidate = self.cursor.execute("""
+                SELECT requestID FROM guest_requests
+                WHERE status = 'Новая' AND role = ? AND (? IS NULL OR floor = ?)
+                ORDER BY priority, created_at
+                LIMIT 1
+            """, (self.current_user[2], floor, floor)).fetchone()
+            if not candidate:
+                messagebox.showinfo("Запросы", "Нет новых запросов")
+                return
+            self.cursor.execute("""
+                UPDATE guest_requests SET status = 'В работе', staff_id = ?, claimed_at = CURRENT_TIMESTAMP
+                WHERE requestID = ? AND status = 'Новая'
+            """, (self.current_user[0], candidate[0]))
+            claimed = self.cursor.rowcount > 0
+            self.conn.commit()
+            if claimed:
+                break
+        self.create_guest_requests_form()
+
+    def complete_guest_request(self, tree):
+        selected_item_id = tree.selection()
+        if not selected_item_id:
+            messagebox.showerror("Ошибка", "Выберите запрос для завершения")
+            return
+        request_id = tree.item(selected_item_id[0])['values'][0]
+
+        complete_query = """
+            UPDATE guest_requests SET status = 'Выполнено', completed_at = CURRENT_TIMESTAMP
+            WHERE requestID = ? AND status = 'В работе'
+        """
+        params = [request_id]
+        if self.current_user[2] not in ['Администратор', 'Руководитель']:
+            complete_query += " AND staff_id = ?"
+            params.append(self.current_user[0])
+
+        self.cursor.execute(complete_query, tuple(params))
+        completed = self.cursor.rowcount > 0
+        self.conn.commit()
+        if completed:
+            messagebox.showinfo("Успех", "Запрос выполнен")
+        else:
+            messagebox.showerror("Ошибка", "Запрос должен быть взят в работу перед завершением.")
+        self.create_guest_requests_form()
+
     def create_reports_form(self):
         content_frame = self.create_base_form(self.create_main_menu)
         form_frame = tbs.Frame(content_frame, bootstyle="primary")
@@ -623,19 +902,57 @@ class HotelManagementApp:
         daily_revenue = revenue_data[0] if revenue_data and revenue_data[0] is not None else 0
         adr = daily_revenue / occupied_rooms_count if occupied_rooms_count > 0 else 0
         revpar = daily_revenue / total_rooms if total_rooms > 0 else 0
+        sla_data = self.cursor.execute("""
+            SELECT COUNT(*),
+                   AVG((julianday(claimed_at) - julianday(created_at)) * 1440),
+                   AVG((julianday(completed_at) - julianday(created_at)) * 1440)
+            FROM guest_requests WHERE date(created_at, 'localtime') = date(?)
+        """, (report_date,)).fetchone()
+        requests_count = sla_data[0]
+        time_to_claim = sla_data[1] if sla_data[1] is not None else 0
+        time_to_complete = sla_data[2] if sla_data[2] is not None else 0
         messagebox.showinfo("Отчет", f"Дата: {report_date_str}\n"
                                    f"Всего номеров: {total_rooms}\n"
                                    f"Занято номеров: {occupied_rooms_count}\n"
                                    f"Процент загрузки: {occupancy_rate:.2f}%\n"
                                    f"Доход за день: {daily_revenue:.2f}\n"
                                    f"ADR (по доходу дня): {adr:.2f}\n"
-                                   f"RevPAR (по доходу дня): {revpar:.2f}")
+                                   f"RevPAR (по доходу дня): {revpar:.2f}\n"
+                                   f"Запросов гостей: {requests_count}\n"
+                                   f"Среднее время до взятия в работу: {time_to_claim:.1f} мин\n"
+                                   f"Среднее время до выполнения: {time_to_complete:.1f} мин")
 
 
     def clear_frame(self):
+        self.change_handlers = {}
         for widget in self.root.winfo_children():
             widget.destroy()
 
+    def poll_changes(self):
+        try:
+            # data_version меняется только после коммитов других подключений, поэтому опрос почти ничего не стоит
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self.data_version:
+                changes = self.conn.execute(
+                    "SELECT seq, table_name, row_id, status FROM change_log WHERE seq > ? ORDER BY seq",
+                    (self.last_change_seq,)
+                ).fetchall()
+                latest_changes = {}
+                for _, table_name, row_id, status in changes:
+                    latest_changes[(table_name, row_id)] = status
+                for (table_name, row_id), status in latest_changes.items():
+                    handler = self.change_handlers.get(table_name)
+                    if handler:
+                        handler(row_id, status)
+                # Позицию сдвигаем только после применения пакета, чтобы при ошибке он повторился на следующем опросе
+                if changes:
+                    self.last_change_seq = changes[-1][0]
+                self.data_version = data_version
+        except (sqlite3.Error, tk.TclError) as e:
+            print(f"Не удалось применить изменения: {e}")
+        finally:
+            self.root.after(500, self.poll_changes)
+
     def create_unblock_users_form(self):
         content_frame = self.create_base_form(self.create_main_menu)
         form_frame = tbs.Frame(content_frame, bootstyle="primary")